@@ -0,0 +1,244 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Benchmarks of the parser, the include graph and completion queries.
+
+Runs the spindex engine outside of Sublime Text against a generated
+include tree:
+
+    python bench/bench.py [--files 400] [--plugins 20] [--queries 2000] [--workers N]
+
+Pass --corpus to reuse a directory instead of generating a temporary one.
+"""
+
+import argparse
+import codecs
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import spindex
+from corpus import generate_corpus
+
+
+def percentiles(samples, points = (50, 90, 99)):
+    samples = sorted(samples)
+    result = []
+    for point in points:
+        index = min(len(samples) - 1, int(round(point / 100.0 * (len(samples) - 1))))
+        result.append(samples[index])
+    return result
+
+
+def report(name, value, unit):
+    print('%-40s %12.2f %s' % (name, value, unit))
+
+
+def report_latencies(name, samples):
+    (p50, p90, p99) = percentiles(samples)
+    print('%-40s p50 %8.3f  p90 %8.3f  p99 %8.3f  max %8.3f ms' % (name, p50 * 1000, p90 * 1000, p99 * 1000, max(samples) * 1000))
+
+
+def reset_graph(include_dir):
+    spindex.nodes.clear()
+    spindex.retired_nodes.nodes.clear()
+    spindex.include_dirs.set([include_dir])
+
+
+def bench_parser(include_files):
+    """ Parses every include file on its own, the files are read beforehand """
+    texts = []
+    for file_name in include_files:
+        with codecs.open(file_name, 'r', 'utf-8') as f:
+            texts.append((file_name, f.read()))
+
+    symbols = 0
+    size = 0
+    start = time.perf_counter()
+    for (file_name, text) in texts:
+        node = spindex.Node(file_name)
+        spindex.process_buffer(text, node)
+        symbols += len(node.funcs)
+        size += len(text)
+    elapsed = time.perf_counter() - start
+
+    print('process_buffer')
+    report('  files', len(texts) / elapsed, 'files/s')
+    report('  symbols', symbols / elapsed, 'symbols/s')
+    report('  throughput', size / elapsed / 1024 / 1024, 'MB/s')
+    report('  total', elapsed * 1000, 'ms')
+
+
+def bench_update(include_files, edits, seed):
+    """ Types single characters at random offsets of one large buffer """
+    rand = random.Random(seed)
+    texts = []
+    for file_name in include_files[:40]:
+        with codecs.open(file_name, 'r', 'utf-8') as f:
+            texts.append(f.read())
+    text = ''.join(texts)
+
+    node = spindex.Node('bench.sp')
+    start = time.perf_counter()
+    spindex.update_buffer(text, node)
+    full = time.perf_counter() - start
+
+    samples = []
+    for i in range(edits):
+        offset = rand.randint(0, len(text))
+        text = text[:offset] + rand.choice('abc_1 \n') + text[offset:]
+        start = time.perf_counter()
+        spindex.update_buffer(text, node)
+        samples.append(time.perf_counter() - start)
+
+    print('update_buffer (%d lines)' % text.count('\n'))
+    report('  first parse', full * 1000, 'ms')
+    report_latencies('  after a one character edit', samples)
+
+
+def bench_function_string(count, seed):
+    rand = random.Random(seed)
+    params = ['int client', 'const char[] name', 'Handle hndl = INVALID_HANDLE', 'float vec[3]', 'any ...']
+    funcs = []
+    for i in range(count):
+        funcs.append('native %s Function%d(%s)' % (rand.choice(['int', 'bool', 'Handle']), i, ', '.join(rand.sample(params, rand.randint(0, 5)))))
+
+    node = spindex.Node('bench.inc')
+    start = time.perf_counter()
+    for func in funcs:
+        spindex.process_function_string(node, func)
+    elapsed = time.perf_counter() - start
+
+    print('process_function_string')
+    report('  signatures', count / elapsed, 'signatures/s')
+
+
+def index_plugins(include_dir, plugin_files):
+    reset_graph(include_dir)
+    thread = spindex.ProcessQueueThread()
+    for file_name in plugin_files:
+        with codecs.open(file_name, 'r', 'utf-8') as f:
+            thread.process(file_name, f.read())
+
+
+def bench_index(include_dir, plugin_files):
+    """ Resolves and parses the include trees of all plugins from scratch """
+    start = time.perf_counter()
+    index_plugins(include_dir, plugin_files)
+    elapsed = time.perf_counter() - start
+
+    nodes = len(spindex.nodes)
+    symbols = sum(len(node.funcs) for node in spindex.nodes.values())
+    print('load_from_file (include graph of %d plugins)' % len(plugin_files))
+    report('  files', nodes / elapsed, 'files/s')
+    report('  symbols', symbols / elapsed, 'symbols/s')
+    report('  total', elapsed * 1000, 'ms')
+
+    if tracemalloc is not None:
+        tracemalloc.start()
+        index_plugins(include_dir, plugin_files)
+        (current, peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report('  peak memory', peak / 1024.0 / 1024.0, 'MB')
+        report('  retained memory', current / 1024.0 / 1024.0, 'MB')
+
+
+def bench_pool(include_dir, plugin_files, workers):
+    """ Indexes the include trees again with the parse workers of each kind """
+    print('load_from_pool (%d workers)' % workers)
+    for kind in ('thread', 'process'):
+        spindex.set_parse_workers(workers, kind)
+        try:
+            start = time.perf_counter()
+            index_plugins(include_dir, plugin_files)
+            elapsed = time.perf_counter() - start
+        finally:
+            spindex.set_parse_workers(1)
+
+        report('  %s pool' % kind, len(spindex.nodes) / elapsed, 'files/s')
+        report('  %s pool total' % kind, elapsed * 1000, 'ms')
+
+
+def bench_queries(include_dir, plugin_files, queries, seed):
+    """ Measures completion queries with a warm cache and after changes """
+    rand = random.Random(seed)
+    index_plugins(include_dir, plugin_files)
+
+    names = [symbol.name for node in spindex.nodes.values() for symbol in node.funcs]
+    includes = [node for node in spindex.nodes.values() if node.file_name not in plugin_files]
+
+    def query(file_name, prefix):
+        start = time.perf_counter()
+        spindex.generate_completions(spindex.nodes[file_name]).lookup(prefix)
+        return time.perf_counter() - start
+
+    def random_prefix():
+        name = rand.choice(names)
+        return name[:rand.randint(1, 3)]
+
+    for file_name in plugin_files:
+        query(file_name, '')
+
+    warm = [query(rand.choice(plugin_files), random_prefix()) for i in range(queries)]
+
+    changed = []
+    for i in range(max(1, queries // 10)):
+        rand.choice(includes).changed()
+        changed.append(query(rand.choice(plugin_files), random_prefix()))
+
+    print('generate_completions + lookup (%d queries)' % queries)
+    report_latencies('  unchanged graph', warm)
+    report_latencies('  after an include changed', changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.split('\n')[0])
+    parser.add_argument('--files', type = int, default = 400, help = 'number of include files to generate')
+    parser.add_argument('--plugins', type = int, default = 20, help = 'number of plugins to generate')
+    parser.add_argument('--queries', type = int, default = 2000, help = 'number of completion queries')
+    parser.add_argument('--workers', type = int, default = os.cpu_count() or 1, help = 'number of parse workers of the pool benchmark')
+    parser.add_argument('--seed', type = int, default = 1)
+    parser.add_argument('--corpus', help = 'directory of the generated corpus, kept after the run')
+    args = parser.parse_args()
+
+    directory = args.corpus or tempfile.mkdtemp(prefix = 'spcompletions-bench-')
+    try:
+        (include_dir, plugin_files) = generate_corpus(directory, args.files, args.plugins, args.seed)
+        include_files = [os.path.join(include_dir, name) for name in sorted(os.listdir(include_dir))]
+        print('corpus: %d include files, %d plugins in %s\n' % (len(include_files), len(plugin_files), directory))
+
+        bench_parser(include_files)
+        bench_update(include_files, 200, args.seed)
+        bench_function_string(10000, args.seed)
+        bench_index(include_dir, plugin_files)
+        if args.workers > 1:
+            bench_pool(include_dir, plugin_files, args.workers)
+        bench_queries(include_dir, plugin_files, args.queries, args.seed)
+    finally:
+        if args.corpus is None:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Generator of a synthetic include tree shaped like SourceMod's.
+
+The tree has a sourcemod.inc that includes the core includes, third party
+includes that include sourcemod and a few of their siblings, and plugins
+that include sourcemod and some third party includes.
+"""
+
+import os
+import random
+
+TYPES = ['int', 'bool', 'float', 'Handle', 'Action', 'void', 'any']
+PARAMS = [
+    'int client',
+    'const char[] name',
+    'char[] buffer',
+    'int maxlength',
+    'bool value = false',
+    'float vec[3]',
+    'const float origin[3] = NULL_VECTOR',
+    'Handle hndl = INVALID_HANDLE',
+    'any data = 0',
+    'int flags = 0',
+    'any ...',
+]
+OLD_PARAMS = ['client', 'const String:name[]', 'String:buffer[]', 'maxlength', 'bool:value=false', 'Float:vec[3]', 'any:data=0']
+
+
+def generate_corpus(directory, files = 400, plugins = 20, seed = 1):
+    """generate_corpus(string, int, int, int) -> (string, list)
+
+    Writes the corpus into directory and returns the include directory and
+    the list of plugin files.
+    """
+    rand = random.Random(seed)
+    include_dir = os.path.join(directory, 'include')
+    plugin_dir = os.path.join(directory, 'plugins')
+    for path in (include_dir, plugin_dir):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    core = ['core_%03d' % i for i in range(max(1, files // 5))]
+    thirdparty = ['thirdparty_%03d' % i for i in range(max(0, files - len(core) - 1))]
+
+    write(include_dir, 'sourcemod.inc', generate_include(rand, 'sourcemod', core))
+    for name in core:
+        write(include_dir, name + '.inc', generate_include(rand, name, []))
+    for (i, name) in enumerate(thirdparty):
+        siblings = rand.sample(thirdparty[:i], min(i, 3))
+        write(include_dir, name + '.inc', generate_include(rand, name, ['sourcemod'] + siblings))
+
+    plugin_files = []
+    for i in range(plugins):
+        includes = ['sourcemod'] + rand.sample(thirdparty, min(len(thirdparty), 5))
+        file_name = write(plugin_dir, 'plugin_%03d.sp' % i, generate_plugin(rand, i, includes))
+        plugin_files.append(file_name)
+
+    return (include_dir, plugin_files)
+
+
+def write(directory, name, text):
+    file_name = os.path.join(directory, name)
+    with open(file_name, 'w') as f:
+        f.write(text)
+    return file_name
+
+
+def generate_include(rand, name, includes):
+    prefix = ''.join(part.capitalize() for part in name.split('_'))
+    out = []
+    out.append('/**\n * %s.inc\n * Generated include for benchmarking.\n */\n\n' % name)
+    out.append('#if defined _%s_included\n #endinput\n#endif\n#define _%s_included\n\n' % (name, name))
+    for include in includes:
+        out.append('#include <%s>\n' % include)
+    out.append('\n')
+
+    for i in range(rand.randint(5, 15)):
+        out.append('#define %s_CONSTANT_%d\t\t%d\t/**< Constant number %d */\n' % (prefix.upper(), i, rand.randint(0, 4096), i))
+    out.append('\n')
+
+    for i in range(rand.randint(1, 4)):
+        out.append('/**\n * Enum number %d.\n */\nenum %sEnum%d\n{\n' % (i, prefix, i))
+        for j in range(rand.randint(3, 12)):
+            out.append('\t%s_Enum%d_Value%d%s,\t\t/**< Member %d */\n' % (prefix, i, j, ' = %d' % (1 << j) if j % 3 == 0 else '', j))
+        out.append('};\n\n')
+
+    for i in range(rand.randint(20, 60)):
+        params = rand.sample(PARAMS, rand.randint(0, 5))
+        kind = 'forward' if i % 8 == 0 else 'native'
+        out.append(generate_doc(rand, params))
+        if i % 10 == 5:
+            # old syntax declaration split over several lines
+            params = rand.sample(OLD_PARAMS, rand.randint(2, 5))
+            out.append('%s bool:%s_OldNative%d(%s,\n\t\t\t\t%s);\n\n' % (kind, prefix, i, ', '.join(params[:-1]), params[-1]))
+        else:
+            out.append('%s %s %s_Function%d(%s);\n\n' % (kind, rand.choice(TYPES), prefix, i, ', '.join(params)))
+
+    # declarations ended by the line break, right before an enum
+    out.append('native %s_Unterminated(a)\nenum %sLateEnum\n{ %s_Late_1, %s_Late_2 }\n\n' % (prefix, prefix, prefix, prefix))
+    out.append('forward %s_OnUnterminated(c)\n\nenum\n{ %s_Anonymous_1 }\n\n' % (prefix, prefix))
+    out.append('new %s_g_x = GetMaxClients()\nenum %sOldEnum\n{ %s_Old_1 }\n\n' % (prefix, prefix, prefix))
+
+    out.append('methodmap %sMap < Handle\n{\n' % prefix)
+    for i in range(rand.randint(2, 8)):
+        out.append('\tpublic native int Method%d(int value);\n' % i)
+    out.append('\tproperty int Count {\n\t\tpublic native get();\n\t}\n};\n\n')
+
+    for i in range(rand.randint(2, 8)):
+        out.append(generate_doc(rand, ['int client']))
+        out.append('stock bool %s_Stock%d(int client)\n{\n\tif (client <= 0 || client > MaxClients)\n\t{\n\t\treturn false;\n\t}\n'
+            '\tchar name[32] = "{}";\n\treturn IsClientInGame(client);\n}\n\n' % (prefix, i))
+
+    return ''.join(out)
+
+
+def generate_doc(rand, params):
+    out = ['/**\n * ', ' '.join(rand.choice(['Returns', 'the', 'value', 'of', 'a', 'client', 'entity', 'property']) for i in range(12)), '\n *\n']
+    for param in params:
+        out.append(' * @param %-16s Description of the parameter.\n' % param.split('=')[0].split()[-1])
+    out.append(' * @return                 Return value.\n * @error                  Invalid client index.\n */\n')
+    return ''.join(out)
+
+
+def generate_plugin(rand, index, includes):
+    out = []
+    for include in includes:
+        out.append('#include <%s>\n' % include)
+    out.append('\n#pragma semicolon 1\n#pragma newdecls required\n\n#define PLUGIN_VERSION "1.%d"\n\n' % index)
+    out.append('public Plugin myinfo =\n{\n\tname = "Plugin %d",\n\tversion = PLUGIN_VERSION\n};\n\n' % index)
+    out.append('public void OnPluginStart()\n{\n\tRegConsoleCmd("sm_test", Command_Test);\n}\n\n')
+    for i in range(rand.randint(10, 40)):
+        out.append('void Helper%d(int client, int value)\n{\n\tif (value > %d)\n\t{\n\t\tPrintToChat(client, "%%d", value);\n\t}\n}\n\n' % (i, i))
+    return ''.join(out)
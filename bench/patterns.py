@@ -0,0 +1,160 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Micro-benchmark of the regular expressions in spindex/patterns.py.
+
+Parses a set of include files while recording every call the parser makes
+to each pattern, then replays the calls of each pattern on its own:
+
+    python bench/patterns.py [--include-dir sourcemod/scripting/include] [--repeat 5]
+
+Without --include-dir a generated corpus is used. The slowest call of a
+pattern shows the inputs it backtracks on.
+"""
+
+import argparse
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import spindex
+from spindex import graph, parser, patterns
+from bench import percentiles
+from corpus import generate_corpus
+
+
+class Recorder:
+    """ Stands in for a compiled pattern and records the calls made to it """
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.calls = []
+
+
+    def __getattr__(self, name):
+        method = getattr(self.pattern, name)
+        calls = self.calls
+        def record(*args):
+            calls.append((method, args))
+            return method(*args)
+        return record
+
+
+def input_length(args):
+    """input_length(tuple) -> int
+
+    Returns the length of the string a call was made on, from its start
+    position: the string is the last one of the arguments, e.g. sub(repl,
+    string) and match(string, pos).
+    """
+    index = max(i for (i, arg) in enumerate(args) if isinstance(arg, str))
+    pos = args[index + 1] if index + 1 < len(args) else 0
+    return len(args[index]) - pos
+
+
+def record_calls(file_names):
+    """ Parses the files and resolves their includes with every pattern recorded """
+    recorders = dict()
+    for name in dir(patterns):
+        if name.endswith('_re'):
+            recorders[name] = Recorder(getattr(patterns, name))
+
+    modules = (graph, parser)
+    saved = [(module, name, getattr(module, name)) for module in modules for name in recorders if hasattr(module, name)]
+    for (module, name, pattern) in saved:
+        setattr(module, name, recorders[name])
+    try:
+        for file_name in file_names:
+            with codecs.open(file_name, 'r', 'utf-8') as f:
+                text = f.read()
+            for include in spindex.process_buffer(text, spindex.Node(file_name)):
+                spindex.get_file_name(file_name, include)
+    finally:
+        for (module, name, pattern) in saved:
+            setattr(module, name, pattern)
+    return recorders
+
+
+def replay(calls, repeat):
+    """replay(list, int) -> (float, list)
+
+    Returns the time of the fastest replay of all the calls, and the time of
+    each call.
+    """
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        for (method, args) in calls:
+            method(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    samples = []
+    for (method, args) in calls:
+        start = time.perf_counter()
+        method(*args)
+        samples.append(time.perf_counter() - start)
+    return (best, samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.split('\n')[0])
+    parser.add_argument('--include-dir', help = 'directory of the include files to parse, e.g. sourcemod/scripting/include')
+    parser.add_argument('--files', type = int, default = 400, help = 'number of include files to generate without --include-dir')
+    parser.add_argument('--repeat', type = int, default = 5, help = 'number of replays of the calls of each pattern')
+    parser.add_argument('--seed', type = int, default = 1)
+    args = parser.parse_args()
+
+    spindex.set_log_level('error')
+    directory = None
+    if args.include_dir is None:
+        directory = tempfile.mkdtemp(prefix = 'spcompletions-patterns-')
+        (include_dir, plugin_files) = generate_corpus(directory, args.files, 0, args.seed)
+    else:
+        include_dir = os.path.abspath(args.include_dir)
+
+    try:
+        spindex.include_dirs.set([include_dir])
+        file_names = []
+        for (path, dirs, files) in os.walk(include_dir):
+            file_names.extend(os.path.join(path, name) for name in files if name.endswith('.inc') or name.endswith('.sp'))
+        file_names.sort()
+
+        start = time.perf_counter()
+        recorders = record_calls(file_names)
+        print('%d files of %s, recorded in %.1f ms\n' % (len(file_names), include_dir, (time.perf_counter() - start) * 1000))
+
+        print('%-20s %9s %10s %10s %10s %10s %12s' % ('pattern', 'calls', 'total ms', 'p50 us', 'p99 us', 'max us', 'max input'))
+        for name in sorted(recorders):
+            calls = recorders[name].calls
+            if not calls:
+                print('%-20s %9d' % (name, 0))
+                continue
+
+            (total, samples) = replay(calls, args.repeat)
+            (p50, p99) = percentiles(samples, (50, 99))
+            slowest = max(range(len(samples)), key = samples.__getitem__)
+            print('%-20s %9d %10.2f %10.2f %10.2f %10.2f %12d' % (name, len(calls), total * 1000, p50 * 1e6, p99 * 1e6,
+                samples[slowest] * 1e6, input_length(calls[slowest][1])))
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Fuzzing and worst case benchmark of the function signature parser.
+
+Checks that process_function_string splits random signatures into the
+parameters they were built from, then times it on pathological signatures
+of growing size, next to the former `(.*?\\))` pattern and comma split:
+
+    python bench/signatures.py [--fuzz 20000] [--sizes 1000,2000,4000,8000]
+
+A time ratio close to 2 between two sizes means linear time.
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import spindex
+
+TYPES = ['int', 'bool', 'float', 'Handle', 'any', 'char', 'Float:', 'String:', '']
+DEFAULTS = [
+    '0',
+    'INVALID_HANDLE',
+    '"a, b"',
+    '"(\\"quoted\\")"',
+    "','",
+    "')'",
+    '{0.0, 0.0, 0.0}',
+    'GetValue(1, 2)',
+    'Max(Min(a, b), (c))',
+    'sizeof(buffer[0]) - 1',
+]
+
+
+def parse_params(func):
+    """parse_params(string) -> tuple"""
+    node = spindex.Node('fuzz.inc')
+    spindex.process_function_string(node, func)
+    return next(iter(node.funcs)).params if node.funcs else None
+
+
+def old_parse_params(func):
+    """ The signature parsing process_function_string did before split_params """
+    m = old_function_re.search(func)
+    if not m:
+        return None
+    remaining = m.group(3).split('(', 1)[1].strip()
+    if remaining == ')':
+        return ()
+    return tuple([param.strip() for param in remaining[:-1].split(',')])
+
+
+def random_param(rand, i):
+    param = '%s%sparam%d' % (rand.choice(TYPES), rand.choice([' ', ' const ', ' ']), i)
+    if rand.random() < 0.3:
+        param += '[%d]' % rand.randint(1, 64)
+    if rand.random() < 0.5:
+        param += ' = ' + rand.choice(DEFAULTS)
+    return param.strip()
+
+
+def fuzz(count, seed):
+    """ Parses random signatures, returns the ones not split as they were built """
+    rand = random.Random(seed)
+    failures = []
+    for i in range(count):
+        params = tuple([random_param(rand, j) for j in range(rand.randint(0, 8))])
+        func = '%s %s Function%d(%s)' % (rand.choice(['native', 'stock', 'forward']), rand.choice(['int', 'void', 'bool']), i, ', '.join(params))
+        if parse_params(func) != params:
+            failures.append(func)
+
+    # garbage must not raise, whatever it returns
+    alphabet = 'ab,()[]{}"\'\\ =:'
+    for i in range(count):
+        parse_params('native F(' + ''.join(rand.choice(alphabet) for j in range(rand.randint(0, 40))))
+    return failures
+
+
+def pathological(n):
+    """pathological(int) -> list of (name, string)"""
+    return [
+        ('many parameters', 'native int F(%s)' % ', '.join(['int a%d' % i for i in range(n // 8)])),
+        ('nested parens', 'native F(int a = %s1%s)' % ('(' * (n // 2), ')' * (n // 2))),
+        ('unclosed list', 'native F(' + 'int a, ' * (n // 7)),
+        ('unclosed string', 'native F(char s = "' + 'a, (' * (n // 4) + ')'),
+        ('strings and braces', 'native F(%s)' % ', '.join(['char s%d[] = "x,(y", float v = {1, 2}' % i for i in range(n // 40)])),
+        ('long name', 'native int ' + 'a' * n + ' b'),
+    ]
+
+
+def measure(function, func, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        function(func)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.split('\n')[0])
+    parser.add_argument('--fuzz', type = int, default = 20000, help = 'number of random signatures')
+    parser.add_argument('--sizes', default = '1000,2000,4000,8000', help = 'lengths of the pathological signatures')
+    parser.add_argument('--repeat', type = int, default = 5)
+    parser.add_argument('--seed', type = int, default = 1)
+    args = parser.parse_args()
+
+    failures = fuzz(args.fuzz, args.seed)
+    print('fuzz: %d signatures, %d split wrongly' % (args.fuzz, len(failures)))
+    for func in failures[:5]:
+        print('  ' + func)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    print('\n%-20s %8s %14s %14s' % ('signature', 'length', 'split_params', '(.*?\\)) split'))
+    for (i, size) in enumerate(sizes):
+        for (name, func) in pathological(size):
+            new = measure(parse_params, func, args.repeat)
+            old = measure(old_parse_params, func, args.repeat)
+            print('%-20s %8d %11.3f ms %11.3f ms' % (name, len(func), new * 1000, old * 1000))
+        print('')
+
+    return 1 if failures else 0
+
+
+old_function_re = re.compile(r'^[ \t]*(?:(native|stock|forward)\b[ \t]+)?(?:([\w_]+)(?: +|:))?([\w_]+ *\(.*?\))')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
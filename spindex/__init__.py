@@ -0,0 +1,27 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Indexing engine of SourcePawn Completions.
+
+Parses SourcePawn files, keeps the graph of their includes and builds the
+completions of a file. Nothing in here depends on the Sublime Text API, so
+the engine can be used from the command line and from benchmarks.
+"""
+
+from .cache import include_cache, IncludeCache
+from .completions import generate_completions, CompletionIndex
+from .log import set_log_level
+from .graph import count_symbols, get_file_name, get_or_add_node, include_dirs, include_resolver, nodes, release_node, retain_node, retired_nodes, IncludeResolver, Node, RetiredNodes
+from .parser import process_buffer, process_include_file, process_function_string, read_file, update_buffer
+from .symbols import strings, Symbol, StringTable
+from .processing import BufferChanges, parse_include, queue_warmup, set_parse_workers, set_warmup_rate, to_process, ProcessQueue, ProcessQueueThread, ACTIVE_LANE, OPEN_LANE, WATCHER_LANE, WARMUP_LANE
@@ -0,0 +1,60 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Indexes SourcePawn files from the command line.
+
+    python -m spindex -I sourcemod/scripting/include plugin.sp [-p prefix] [-j workers]
+"""
+
+import argparse
+import codecs
+import os
+import time
+
+from . import generate_completions, include_dirs, nodes, set_log_level, set_parse_workers, ProcessQueueThread
+
+
+def main():
+    parser = argparse.ArgumentParser(prog = 'spindex', description = 'Index SourcePawn files and print their completions.')
+    parser.add_argument('files', nargs = '+', help = '.sp or .inc files to index')
+    parser.add_argument('-I', '--include', dest = 'include_dirs', action = 'append', default = [], help = 'include directory, may be repeated')
+    parser.add_argument('-p', '--prefix', help = 'print the completions of the files matching this prefix')
+    parser.add_argument('-l', '--log-level', default = 'warning', help = 'error, warning, info or debug')
+    parser.add_argument('-j', '--workers', type = int, default = 1, help = 'number of workers parsing include files')
+    parser.add_argument('--pool', choices = ['thread', 'process'], default = 'process', help = 'kind of worker pool used with -j')
+    args = parser.parse_args()
+
+    set_log_level(args.log_level)
+    set_parse_workers(args.workers, args.pool)
+
+    include_dirs.set([os.path.abspath(path) for path in args.include_dirs])
+    thread = ProcessQueueThread()
+
+    start = time.time()
+    for file_name in args.files:
+        file_name = os.path.abspath(file_name)
+        with codecs.open(file_name, 'r', 'utf-8') as f:
+            thread.process(file_name, f.read())
+    elapsed = time.time() - start
+
+    symbols = sum(len(node.funcs) for node in nodes.values())
+    print('Indexed %d files with %d symbols in %.3f s' % (len(nodes), symbols, elapsed))
+
+    if args.prefix is not None:
+        for file_name in args.files:
+            for (trigger, contents) in generate_completions(nodes[os.path.abspath(file_name)]).lookup(args.prefix):
+                print('%s\t%s' % (trigger.replace('\t', ' '), contents))
+
+
+if __name__ == '__main__':
+    main()
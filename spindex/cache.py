@@ -0,0 +1,124 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pickle
+from threading import Lock
+
+from .log import logger
+
+
+class IncludeCache:
+    """ Persistent cache of parsed include files.
+
+    Entries are keyed by file path and are valid while the file's
+    modification time and size match the ones recorded when it was parsed,
+    or while its contents still have the same digest.
+    """
+    VERSION = 4
+
+    def __init__(self):
+        self.file_name = None
+        self.entries = dict()
+        self.dirty = False
+        self.lock = Lock()
+
+
+    def load(self, file_name):
+        with self.lock:
+            self.file_name = file_name
+            self.entries = dict()
+            self.dirty = False
+
+            if not os.path.exists(file_name):
+                return
+
+            # unpickling damaged or incompatible data can raise about anything,
+            # and a bad cache must not keep the plugin from loading
+            try:
+                with open(file_name, 'rb') as f:
+                    (version, entries) = pickle.load(f)
+            except Exception as e:
+                logger.warning('Unable to load include cache %s: %s', file_name, e)
+                return
+
+            if version == IncludeCache.VERSION:
+                self.entries = entries
+
+
+    def save(self):
+        with self.lock:
+            if not self.dirty or self.file_name is None:
+                return
+            self.dirty = False
+            entries = dict(self.entries)
+
+        try:
+            directory = os.path.dirname(self.file_name)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+
+            temp_file_name = self.file_name + '.tmp'
+            with open(temp_file_name, 'wb') as f:
+                pickle.dump((IncludeCache.VERSION, entries), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file_name, self.file_name)
+        except (OSError, IOError) as e:
+            logger.warning('Unable to save include cache: %s', e)
+
+
+    def get(self, file_name, stat, digest = None):
+        """ Returns the cached (digest, includes, funcs) of a file or None if the file changed
+
+        A file that was only touched is recognized by passing the digest of
+        its contents, the entry then takes the new modification time.
+        """
+        with self.lock:
+            if self.file_name is None:
+                return None
+
+            entry = self.entries.get(file_name)
+            if entry is None:
+                return None
+
+            (mtime, size, entry_digest, includes, funcs) = entry
+            if mtime != stat.st_mtime or size != stat.st_size:
+                if digest is None:
+                    return None
+                if digest != entry_digest:
+                    del self.entries[file_name]
+                    self.dirty = True
+                    return None
+
+                self.entries[file_name] = (stat.st_mtime, stat.st_size, entry_digest, includes, funcs)
+                self.dirty = True
+
+            return (entry_digest, includes, funcs)
+
+
+    def digest(self, file_name):
+        """ Returns the digest of the cached contents of a file or None """
+        with self.lock:
+            entry = self.entries.get(file_name)
+            return entry[2] if entry is not None else None
+
+
+    def put(self, file_name, stat, digest, includes, funcs):
+        with self.lock:
+            if self.file_name is None:
+                return
+
+            self.entries[file_name] = (stat.st_mtime, stat.st_size, digest, tuple(includes), tuple(funcs))
+            self.dirty = True
+
+
+include_cache = IncludeCache()
@@ -0,0 +1,82 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from bisect import bisect_left
+
+
+class CompletionIndex:
+    """ Symbols sorted by their lowercase name, so the ones matching a prefix
+    can be found with a binary search. Symbols are only formatted as
+    completions once a lookup returns them.
+    """
+    def __init__(self, funcset):
+        # symbol[1] is the name, indexing is much faster than the field
+        entries = [(symbol[1].lower(), symbol) for symbol in funcset]
+        entries.sort()
+        self.keys = [key for (key, symbol) in entries]
+        self.symbols = [symbol for (key, symbol) in entries]
+        self.completions = [None] * len(entries) # formatted on the first lookup returning them
+
+
+    def lookup(self, prefix, limit = 0):
+        prefix = prefix.lower()
+        if prefix:
+            start = bisect_left(self.keys, prefix)
+            # first key that doesn't start with the prefix
+            end = bisect_left(self.keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+        else:
+            (start, end) = (0, len(self.keys))
+
+        if limit > 0:
+            end = min(end, start + limit)
+
+        completions = self.completions
+        if None in completions[start:end]:
+            for i in range(start, end):
+                if completions[i] is None:
+                    completions[i] = self.symbols[i].completion()
+        return completions[start:end]
+
+
+def generate_completions(node):
+    """generate_completions(Node) -> CompletionIndex
+
+    Returns the completions of node and everything it includes.
+    """
+    # Reuse the index until a node of the include closure changes
+    index = node.completions
+    if index is not None and not node.stale:
+        return index
+
+    # Cleared before reading, so a concurrent change marks it stale again
+    node.stale = False
+    funcset = set()
+    visited = set()
+
+    generate_completions_recur(node, funcset, visited)
+    index = CompletionIndex(funcset)
+    node.completions = index
+    return index
+
+
+def generate_completions_recur(node, funcset, visited):
+    if node in visited:
+        return
+
+    # the next change of the node has to reach this root again
+    visited.add(node)
+    node.propagated = False
+    for child in list(node.children):
+        generate_completions_recur(child, funcset, visited)
+
+    funcset.update(node.funcs)
@@ -0,0 +1,298 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from collections import OrderedDict
+from threading import Lock, RLock
+
+from . import log
+from .log import logger
+from .patterns import local_re
+from .symbols import strings
+
+
+class Wrapper:
+    def __init__(self):
+        self.value = []
+        self.generation = 0
+    def set(self, newval):
+        if newval != self.value:
+            self.generation += 1
+        self.value = newval
+    def get(self):
+        return self.value
+
+
+def get_file_name(view_file_name, base_file_name):
+    if local_re.search(base_file_name) != None:
+        # next to the file, which isn't watched, so this isn't cached
+        file_name = os.path.join(os.path.dirname(view_file_name), base_file_name)
+        exists = os.path.exists(file_name)
+        if not exists:
+            logger.warning('Include File Not Found: %s (%s)', base_file_name, file_name)
+        return (file_name, exists)
+
+    generation = include_dirs.generation
+    entry = include_resolver.get(base_file_name, generation)
+    if entry is not None:
+        return entry
+
+    dirs = include_dirs.get()
+    if type(dirs) is not list:
+        dirs = [dirs]
+
+    file_name = ''
+    exists = False
+    probed = []
+    for path in dirs:
+        file_name = os.path.join(path, base_file_name + '.inc')
+        probed.append(file_name)
+        exists = os.path.exists(file_name)
+        if exists:
+            break
+
+    if not exists:
+        logger.warning('Include File Not Found: %s (%s)', base_file_name, file_name)
+
+    entry = (file_name, exists)
+    include_resolver.put(base_file_name, generation, entry, probed)
+    return entry
+
+
+class IncludeResolver:
+    """ Cache of the files in the include directories includes resolve to,
+    including missing ones.
+
+    Entries are dropped when the include directories change, or when one of
+    the paths probed to resolve them is created, deleted or moved.
+    """
+    def __init__(self):
+        self.generation = 0
+        self.entries = dict()   # include -> (file name, exists)
+        self.keys = dict()      # probed path -> includes that probed it
+        self.lock = Lock()
+
+
+    def get(self, key, generation):
+        with self.lock:
+            if generation != self.generation:
+                self.generation = generation
+                self.entries.clear()
+                self.keys.clear()
+                return None
+            return self.entries.get(key)
+
+
+    def put(self, key, generation, entry, probed):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = entry
+            for path in probed:
+                self.keys.setdefault(os.path.normcase(os.path.normpath(path)), set()).add(key)
+
+
+    def invalidate(self, path, is_directory = False):
+        """ Drops the entries that probed path, or any path below it for a directory """
+        path = os.path.normcase(os.path.normpath(path))
+        with self.lock:
+            if is_directory:
+                prefix = os.path.join(path, '')
+                paths = [probed for probed in self.keys if probed.startswith(prefix)]
+            else:
+                paths = [path]
+
+            for probed in paths:
+                for key in self.keys.pop(probed, ()):
+                    self.entries.pop(key, None)
+
+
+def get_or_add_node( file_name):
+    with nodes_lock:
+        node = nodes.get(file_name)
+        if node is None:
+            node = Node(file_name)
+            nodes[file_name] = node
+            return (node, True)
+
+        retired_nodes.revive(node)
+        return (node, False)
+
+
+def retain_node(file_name):
+    """retain_node(string) -> Node
+
+    Adds a reference to the node of a file that is open, so it stays in the
+    graph while it isn't included by anything.
+    """
+    with nodes_lock:
+        (node, node_added) = get_or_add_node(file_name)
+        node.refs += 1
+        return node
+
+
+def release_node(file_name):
+    """release_node(string)
+
+    Drops a reference added by retain_node. The node is retired once nothing
+    refers to it.
+    """
+    with nodes_lock:
+        node = nodes.get(file_name)
+        if node is None:
+            return
+
+        node.refs = max(node.refs - 1, 0)
+        if not node.is_referenced():
+            retired_nodes.add(node)
+
+
+class RetiredNodes:
+    """ Nodes nothing refers to anymore, kept in LRU order.
+
+    They stay in the graph, so a file that is included or opened again soon
+    is reused instead of being parsed again. The least recently retired ones
+    are evicted past the limit, or while the graph holds more symbols than
+    the budget (0 - no budget). Evicting a node releases its includes, so
+    everything that isn't reachable from an open file can be evicted.
+
+    Nodes are only evicted by trim, which the processing thread calls when
+    it has nothing left to do. It also drops the strings of the symbols that
+    are gone from the string table. Open files are retained and released on
+    the main thread, so nodes and the retired nodes change under nodes_lock.
+    """
+    def __init__(self, limit, budget = 0):
+        self.limit = limit
+        self.budget = budget
+        self.nodes = OrderedDict()
+
+
+    def add(self, node):
+        with nodes_lock:
+            self.nodes.pop(node.file_name, None)
+            self.nodes[node.file_name] = node
+            # the text of a closed view is parsed from scratch if it is opened again
+            node.text = None
+            node.segments = None
+
+
+    def revive(self, node):
+        with nodes_lock:
+            if self.nodes.get(node.file_name) is node:
+                del self.nodes[node.file_name]
+
+
+    def full(self):
+        """ Returns whether trim would evict a node if another one was added """
+        return len(self.nodes) >= self.limit or bool(self.budget and count_symbols() >= self.budget)
+
+
+    def set_limits(self, limit, budget):
+        self.limit = limit
+        self.budget = budget
+
+
+    def trim(self):
+        with nodes_lock:
+            while len(self.nodes) > self.limit or (self.nodes and self.budget and count_symbols() > self.budget):
+                (file_name, oldest) = self.nodes.popitem(False)
+                # checked under the lock, so a retain_node can't revive it meanwhile
+                if not oldest.is_referenced():
+                    oldest.evict()
+                    if log.info_enabled:
+                        logger.info('Evicted %s', file_name)
+
+        strings.prune(list(nodes.values()))
+
+
+def count_symbols():
+    """count_symbols() -> int"""
+    return sum(len(node.funcs) for node in list(nodes.values()))
+
+
+class Node:
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.label = strings.get(os.path.basename(file_name).rsplit('.')[0]) if file_name else '' # shown after its symbols
+        self.children = set()
+        self.parents = set()
+        self.refs = 0           # open views of the file, see retain_node
+        self.funcs = set()
+        self.completions = None # completions of this node as a root
+        self.stale = True       # completions has to be rebuilt
+        self.propagated = False # the files including this one are stale since it last changed
+        self.text = None        # last text parsed by update_buffer
+        self.segments = None    # [(end offset, funcs, includes)] of the top level statements of text
+        self.digest = None      # digest of the file contents funcs were parsed from
+
+
+    def changed(self):
+        """ Marks the completions of this node and of every file including it as stale
+
+        Propagation stops at nodes that already marked the files including
+        them, rebuilding completions resets the flag for the whole closure.
+        """
+        pending = [self]
+        while pending:
+            node = pending.pop()
+            if node.propagated:
+                continue
+            node.propagated = True
+            node.stale = True
+            pending.extend(list(node.parents))
+
+
+    def add_child(self, node):
+        if node not in self.children:
+            self.children.add(node)
+            node.parents.add(self)
+            self.changed()
+
+
+    def remove_child(self, node):
+        self.children.remove(node)
+        node.parents.remove(self)
+        self.changed()
+
+        if not node.is_referenced():
+            retired_nodes.add(node)
+
+
+    def is_referenced(self):
+        return self.refs > 0 or len(self.parents) > 0
+
+
+    def evict(self):
+        """ Removes the node from the graph and releases the files it includes """
+        if nodes.get(self.file_name) is self:
+            nodes.pop(self.file_name)
+        for child in list(self.children):
+            self.remove_child(child)
+        self.completions = None
+
+
+    def remove_all_children_and_funcs(self):
+        for child in list(self.children):
+            self.remove_child(child)
+        self.funcs = set()
+        self.text = None
+        self.segments = None
+        self.digest = None
+        self.changed()
+
+
+nodes = dict() # map files to nodes
+nodes_lock = RLock() # nodes and retired_nodes change on the main and the processing thread
+retired_nodes = RetiredNodes(256)
+include_dirs = Wrapper()
+include_resolver = IncludeResolver()
@@ -0,0 +1,48 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Logging of the indexing engine.
+
+The parser checks debug_enabled/info_enabled before building a message, so
+disabled levels cost a single attribute lookup per symbol.
+"""
+
+import logging
+
+LEVELS = {
+    'debug': logging.DEBUG,     # every parsed symbol
+    'info': logging.INFO,       # one summary line per parsed file
+    'warning': logging.WARNING, # missing includes and cache errors
+    'error': logging.ERROR,
+}
+
+logger = logging.getLogger('spindex')
+logger.setLevel(logging.WARNING)
+debug_enabled = False
+info_enabled = False
+
+
+def set_log_level(name):
+    """set_log_level(string)"""
+    global debug_enabled, info_enabled
+
+    level = LEVELS.get(str(name).lower(), logging.WARNING)
+    logger.setLevel(level)
+    debug_enabled = level <= logging.DEBUG
+    info_enabled = level <= logging.INFO
+
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('SourcePawn Completions: %(message)s'))
+        logger.addHandler(handler)
+        logger.propagate = False
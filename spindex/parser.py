@@ -0,0 +1,526 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import time
+from bisect import bisect_left
+
+from . import log
+from .log import logger
+from .graph import Node
+from .patterns import body_token_re, comment_re, continuation_re, define_re, enum_re, function_re, include_re, param_token_re, signature_re, statement_token_re, token_re, whitespace_re
+from .symbols import strings, Symbol, CONSTANT, ENUM, FUNCTION, VARIABLE
+
+
+DEPRECATED_FUNCTIONS = [
+    "native Float:operator*",
+    "native Float:operator/",
+    "native Float:operator+",
+    "native Float:operator-",
+    "stock Float:operator*",
+    "stock Float:operator/",
+    "stock Float:operator+",
+    "stock Float:operator-",
+    "stock bool:operator=",
+    "stock bool:operator!",
+    "stock bool:operator>",
+    "stock bool:operator<",
+    "forward operator%("
+]
+
+# Code after this point adapted from
+# https://forums.alliedmods.net/showpost.php?p=1866026&postcount=19
+# Credit to MCPAN (mcpan@foxmail.com)
+def process_buffer(text, node):
+    """process_buffer(string, Node) -> list
+
+    Extracts the symbols of a SourcePawn source in a single pass over its
+    tokens. Only declarations at the top level are considered, bodies of
+    functions, methodmaps and structs are skipped except for their defines
+    and includes. Returns the includes of the source.
+    """
+    start_time = time.time() if log.info_enabled else 0
+    node.text = None
+    node.segments = None
+
+    # the main thread may be reading node.funcs, so a new set is swapped in
+    scratch = Node(node.file_name)
+    includes = []
+    parse_tokens(text, scratch, includes)
+
+    # the files including this one only go stale if its symbols changed
+    if scratch.funcs != node.funcs:
+        node.funcs = scratch.funcs
+        node.changed()
+
+    if log.info_enabled:
+        logger.info('Parsed %s: %d symbols in %.1f ms', node.file_name, len(node.funcs), (time.time() - start_time) * 1000)
+    return includes
+
+
+def update_buffer(text, node, cancelled = None):
+    """update_buffer(string, Node, function) -> list
+
+    Parses the text of a buffer that is being edited and returns its
+    includes. The top level statements of the previous text are kept on the
+    node, so only the ones around the changed part of the text are parsed
+    again.
+
+    cancelled is polled every few statements, ParseCancelled is raised when it
+    returns True and the node is left as it was.
+    """
+    start_time = time.time() if log.info_enabled else 0
+    old_text = node.text
+    if old_text == text:
+        return segment_includes(node.segments)
+
+    scratch = Node(node.file_name)
+    segments = []
+    if old_text is None:
+        restart = 0
+        parse_tokens(text, scratch, [], 0, segments, None, cancelled)
+    else:
+        old_segments = node.segments
+        ends = [segment[0] for segment in old_segments]
+
+        prefix = common_prefix_length(old_text, text)
+        changed_end = len(text) - common_suffix_length(old_text, text, min(len(old_text), len(text)) - prefix)
+        delta = len(text) - len(old_text)
+
+        # the statement ending right before the change is parsed again too,
+        # its last token may have looked ahead into the change
+        first = max(bisect_left(ends, prefix) - 1, 0)
+        restart = ends[first - 1] if first > 0 else 0
+
+        def sync(pos):
+            # past the change, the rest is parsed like before once a boundary matches
+            if pos <= changed_end:
+                return False
+            i = bisect_left(ends, pos - delta)
+            return i < len(ends) and ends[i] == pos - delta
+
+        stop = parse_tokens(text, scratch, [], restart, segments, sync, cancelled)
+        if stop is not None:
+            i = bisect_left(ends, stop - delta)
+            segments.extend((end + delta, funcs, includes) for (end, funcs, includes) in old_segments[i + 1:])
+        segments[0:0] = old_segments[:first]
+
+    funcs = set().union(*[segment[1] for segment in segments])
+    node.text = text
+    node.segments = segments
+    node.digest = None
+    if funcs != node.funcs:
+        node.funcs = funcs
+        node.changed()
+
+    if log.info_enabled:
+        logger.info('Updated %s: %d symbols, parsed from offset %d of %d in %.1f ms', node.file_name, len(node.funcs), restart, len(text), (time.time() - start_time) * 1000)
+    return segment_includes(segments)
+
+
+def segment_includes(segments):
+    """segment_includes(list) -> list"""
+    return [include for segment in segments for include in segment[2]]
+
+
+def parse_tokens(text, node, includes, pos = 0, segments = None, sync = None, cancelled = None):
+    """parse_tokens(string, Node, list, int, list, function, function) -> int
+
+    Adds the symbols found from pos, which has to be at the top level, to the
+    node and the files it includes to includes. With segments, the symbols
+    and includes of each top level statement are moved out of node.funcs and
+    includes into (end offset, funcs, includes) entries, and the parse stops
+    at the first statement end for which sync returns True. Returns that
+    offset, or None if the end of the text was reached. Raises ParseCancelled
+    if cancelled returns True at a statement end.
+    """
+    brace_level = 0
+    paren_level = 0
+    start = None            # offset of the current top level statement
+    found_params = False    # the statement contains a complete parameter list
+    maybe_done = False      # the statement ends unless a '{' or ';' follows
+    deprecated = False
+    enum_type = None        # set while inside the body of an enum
+    enum_start = 0
+    kind = None
+
+    while True:
+        if segments is not None and start is None and brace_level == 0 and not deprecated and kind in segment_end_kinds:
+            segments.append((pos, node.funcs, tuple(includes)))
+            node.funcs = set()
+            del includes[:]
+            if sync is not None and sync(pos):
+                return pos
+            if cancelled is not None and len(segments) % CANCEL_CHECK_INTERVAL == 0 and cancelled():
+                raise ParseCancelled(node.file_name)
+
+        # bodies only matter for their nesting, so jump to the next brace
+        if brace_level > 0:
+            m = body_token_re.match(text, pos)
+        elif start is None:
+            m = token_re.match(text, pos)
+        else:
+            m = statement_token_re.match(text, pos)
+        if m is None or m.lastgroup == 'end':
+            break
+
+        pos = m.end()
+        kind = m.lastgroup
+
+        if kind == 'comment':
+            continue
+
+        if kind == 'preproc':
+            if process_directive(node, m.group(kind), includes) and brace_level == 0:
+                deprecated = True
+            continue
+
+        if kind == 'declaration':
+            # a complete declaration without comments or nested parens
+            if deprecated:
+                deprecated = False
+            elif m.group().endswith(';'):
+                process_declaration(node, m.group()[:-1])
+            else:
+                enum_type = process_block_header(node, m.group()[:-1])
+            if m.group().endswith('{'):
+                brace_level = 1
+                enum_start = pos
+            continue
+
+        if brace_level > 0:
+            if kind == 'open':
+                brace_level += 1
+            elif kind == 'close':
+                brace_level -= 1
+                if brace_level == 0 and enum_type is not None:
+                    process_enum(node, text[enum_start:m.start(kind)], enum_type)
+                    enum_type = None
+            continue
+
+        if kind == 'newline':
+            if found_params and paren_level == 0:
+                maybe_done = True
+            continue
+
+        if kind == 'text' and m.group().isspace():
+            continue
+
+        # declarations without a trailing semicolon end at the line break
+        if maybe_done:
+            maybe_done = False
+            if kind != 'open' and kind != 'semi':
+                if not deprecated:
+                    process_declaration(node, text[start:m.start()])
+                deprecated = False
+                start = None
+                found_params = False
+
+        if start is None:
+            start = m.start()
+
+        if kind == 'lparen':
+            paren_level += 1
+        elif kind == 'rparen':
+            if paren_level > 0:
+                paren_level -= 1
+                found_params = paren_level == 0
+        elif paren_level > 0:
+            # braces of default arguments, e.g. float vec[3] = {0.0, 0.0, 0.0}
+            continue
+        elif kind == 'semi' or kind == 'open' or kind == 'close':
+            if kind == 'open':
+                brace_level = 1
+                enum_start = m.end()
+                if not deprecated:
+                    enum_type = process_block_header(node, text[start:m.start()])
+            elif kind == 'semi' and not deprecated:
+                process_declaration(node, text[start:m.start()])
+
+            deprecated = False
+            start = None
+            found_params = False
+
+    if start is not None and not deprecated:
+        process_declaration(node, text[start:])
+
+    if segments is not None:
+        segments.append((len(text), node.funcs, tuple(includes)))
+        node.funcs = set()
+        del includes[:]
+    return None
+
+
+class ParseCancelled(Exception):
+    """ Raised when a parse is abandoned for a newer version of the text """
+
+
+def common_prefix_length(a, b):
+    """common_prefix_length(string, string) -> int"""
+    low = 0
+    high = min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[low:mid] == b[low:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def common_suffix_length(a, b, limit):
+    """common_suffix_length(string, string, int) -> int"""
+    low = 0
+    high = limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid:len(a) - low] == b[len(b) - mid:len(b) - low]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def process_include_file(node):
+    (data, digest) = read_file(node.file_name)
+    process_buffer(data.decode('utf-8'), node)
+    node.digest = digest
+
+
+def read_file(file_name):
+    """read_file(string) -> (bytes, bytes)
+
+    Reads a file once and returns its contents and their digest. Decoding is
+    left to the caller, so files whose digest is known are never decoded.
+    """
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    return (data, hashlib.sha1(data).digest())
+
+
+def clean_statement(buffer):
+    """clean_statement(string) -> string"""
+    if '/' in buffer:
+        buffer = comment_re.sub(lambda m: m.group(1) or ' ', buffer)
+    if '\n' in buffer or '\t' in buffer or '  ' in buffer:
+        buffer = whitespace_re.sub(' ', buffer)
+    return buffer.strip()
+
+
+def process_directive(node, buffer, includes):
+    """process_directive(Node, string, list) -> bool
+
+    Adds the file an #include directive names to includes. Returns whether the
+    directive marks the next declaration as deprecated.
+    """
+    if '\\' in buffer:
+        buffer = continuation_re.sub(' ', buffer)
+    buffer = clean_statement(buffer)
+
+    if buffer.startswith('#define '):
+        get_preprocessor_define(node, buffer)
+    elif buffer.startswith('#include'):
+        m = include_re.match(buffer)
+        if m:
+            includes.append(m.group(1))
+    elif buffer.startswith('#pragma deprecated'):
+        return True
+    return False
+
+
+def process_block_header(node, buffer):
+    """process_block_header(Node, string) -> string
+
+    Handles the statement in front of a top level '{'. Returns the name of the
+    enum ('' if it has none) if the block is the body of an enum, otherwise
+    None.
+    """
+    buffer = clean_statement(buffer)
+
+    m = enum_re.search(buffer + ' ')
+    if m:
+        if m.group(1): # if struct was found, dont do anything. Unsupported currently
+            return None
+        if log.debug_enabled:
+            logger.debug('Found enum: %s', buffer)
+        return strings.get(m.group(2)) if m.group(2) else ''
+
+    process_declaration(node, buffer)
+    return None
+
+
+def process_declaration(node, buffer):
+    """process_declaration(Node, string)"""
+    buffer = clean_statement(buffer)
+    if not buffer:
+        return
+
+    if buffer.startswith('public ') or buffer.startswith('struct ') or buffer.startswith('methodmap '):
+        if log.debug_enabled:
+            logger.debug('Skipping public, methodmap, or struct: %s', buffer)
+        return
+
+    if not function_re.search(buffer):
+        return
+
+    parenpos = buffer.find('(')
+    eqpos = buffer.find('=')
+    if eqpos != -1 and eqpos < parenpos:
+        return
+
+    full_func_str = buffer[0:buffer.rfind(')') + 1]
+    if not full_func_str in DEPRECATED_FUNCTIONS:
+        process_function_string(node, full_func_str)
+
+
+# def process_methodmap(node, buffer):
+
+def process_variable(node, buffer):
+    file = node.label
+
+    result = ''
+    consumingKeyword = True
+    consumingName = False
+    consumingBrackets = False
+
+    for c in buffer:
+        if consumingKeyword:
+            if c == ' ':
+                consumingKeyword = False
+                consumingName = True
+        elif consumingName:
+            if c == ':':
+                result = ''
+            elif c == ' ' or c == '=' or c == ';':
+                result = result.strip()
+                if result != '':
+                    node.funcs.add(Symbol(VARIABLE, result, '', (), file))
+                result = ''
+                consumingName = False
+                consumingBrackets = False
+            elif c == '[':
+                consumingBrackets = True
+            elif not consumingBrackets:
+                result += c
+        elif c == ',':
+            consumingName = True
+
+    result = result.strip()
+    if result != '':
+        node.funcs.add(Symbol(VARIABLE, result, '', (), file))
+
+    return ''
+
+
+def process_enum(node, buffer, enum_type):
+    """process_enum(Node, string, string)"""
+    file = node.label
+
+    buffer = clean_statement(buffer)
+    if log.debug_enabled:
+        logger.debug('Processing enum: %s', buffer)
+
+    for member in buffer.split(','):
+        # drop the value and the tag of the member
+        member = member.split('=', 1)[0].rsplit(':', 1)[-1].strip()
+        if member != '':
+            node.funcs.add(Symbol(ENUM, member, enum_type, (), file))
+
+
+def get_preprocessor_define(node, buffer):
+    file = node.label
+
+    if log.debug_enabled:
+        logger.debug('Processing define: %s', buffer)
+    """get_preprocessor_define(File, string) -> string"""
+    # Regex the #define. Group 1 is the name, Group 2 is the value
+    define = define_re.search(buffer)
+    if define:
+        # The whole line is consumed, return an empty string to indicate that
+        buffer = ''
+        name = define.group(1)
+        value = define.group(2).strip()
+        node.funcs.add(Symbol(CONSTANT, name, strings.get(value), (), file))
+    return buffer
+
+
+def process_function_string(node, func):
+    """process_function_string(Node, string)"""
+    if 'deprecated' in func:
+        return
+
+    if log.debug_enabled:
+        logger.debug('Processing Function: %s', func)
+
+    file = node.label
+
+    m = signature_re.search(func)
+    if not m:
+        return
+    return_type = m.group(2) if m.group(2) else '_'
+    if m.group(1):
+        return_type = m.group(1) + ' ' + return_type
+    funcname = m.group(3)
+
+    params = split_params(func, m.end())
+    if params is None:
+        return
+    if len(params) == 1 and not params[0].strip():
+        params = ()
+    else:
+        params = tuple([strings.get(param.strip()) for param in params])
+
+    node.funcs.add(Symbol(FUNCTION, funcname, strings.get(return_type), params, file))
+
+
+def split_params(func, start):
+    """split_params(string, int) -> list
+
+    Splits the parameter list starting at start, after its '(', up to the ')'
+    closing it. Commas nested in parens, brackets, braces, strings or
+    characters, e.g. in default values, don't split parameters. Returns None
+    if the list isn't closed. Every character is matched once, so this takes
+    linear time whatever the input.
+    """
+    close = func.find(')', start)
+    if close == -1:
+        return None
+
+    inner = func[start:close]
+    if '(' not in inner and '{' not in inner and '"' not in inner and "'" not in inner:
+        return inner.split(',')
+
+    params = []
+    begin = start
+    depth = 0
+    for m in param_token_re.finditer(func, start):
+        token = m.group()
+        if len(token) != 1:
+            continue
+        if token == ',':
+            if depth == 0:
+                params.append(func[begin:m.start()])
+                begin = m.end()
+        elif token in '([{':
+            depth += 1
+        elif token in ')]}':
+            if depth > 0:
+                depth -= 1
+            elif token == ')':
+                params.append(func[begin:m.start()])
+                return params
+    return None
+
+
+segment_end_kinds = ('semi', 'close', 'declaration', 'preproc')
+CANCEL_CHECK_INTERVAL = 64 # statements parsed between two checks of cancelled
@@ -0,0 +1,65 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Regular expressions of the parser.
+
+All of them are compiled once here. bench/patterns.py replays the calls the
+parser makes to each of them on a set of include files, so the cost of a
+pattern change, backtracking included, can be measured.
+"""
+
+import re
+
+enum_re = re.compile(r'^[ \t]*enum\b[ \t]+(struct\b[ \t]+)?([\w_]+)?')
+function_re = re.compile(r'^[ \t]*(?:(native|stock|forward)\b[ \t]+)?(?:([\w_]+)(?:[ \t]+|:))?([\w_]+[ \t]*\()')
+# up to the '(' of the parameters, which split_params takes from there
+signature_re = re.compile(r'^[ \t]*(?:(native|stock|forward)\b[ \t]+)?(?:([\w_]+)(?: +|:))?([\w_]+) *\(')
+# runs of characters that don't nest or split parameters, strings, characters
+param_token_re = re.compile(r'''[^,()\[\]{}"']+|"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?|.''', re.DOTALL)
+local_re = re.compile(r'\.(sp|inc)$')
+include_re = re.compile(r'#include[ \t]*[<"]([^>"]+)[>"]')
+define_re = re.compile(r'#define[ \t]+([^\s]+)[\s]+(.+)')
+comment_re = re.compile(r'("(?:[^"\\\n]|\\.)*"?)|/\*.*?(?:\*/|\Z)|//[^\n]*', re.DOTALL)
+whitespace_re = re.compile(r'\s+')
+continuation_re = re.compile(r'\\\r?\n')
+preproc_pattern = r'(?P<preproc>^[ \t]*\#(?:[^\n/\\]+|/(?![/*])|\\(?:\r?\n)?)*)'
+comment_pattern = r'(?P<comment>/\*.*?(?:\*/|\Z)|//[^\n]*)'
+string_pattern = r'''(?P<string>"(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?)'''
+statement_pattern = r'''
+    %s
+  | %s
+  | %s
+  | (?P<newline>\s*\n(?:[ \t\r]*(?![ \t\r\#]))?)
+  | (?P<open>\{)
+  | (?P<close>\})
+  | (?P<lparen>\()
+  | (?P<rparen>\))
+  | (?P<semi>;)
+  | (?P<text>[^{}()";'/\#\n]+|.)
+''' % (preproc_pattern, comment_pattern, string_pattern)
+token_re = re.compile(r'''
+    (?P<declaration>[^{}();"'/\#\n]*\([^{}();"'/\#]*\)[^{}();"'/\#\n]*[;{])
+  | ''' + statement_pattern, re.MULTILINE | re.DOTALL | re.VERBOSE)
+statement_token_re = re.compile(statement_pattern, re.MULTILINE | re.DOTALL | re.VERBOSE)
+# bodies are skipped up to the next token that affects the nesting. Every
+# stop of the skipped part is a valid token, so the match never backtracks
+body_token_re = re.compile(r'''
+    (?:[^{}"'/\n]+|\n(?![ \t]*\#)|/(?![/*]))*
+    (?: (?P<preproc>\n[ \t]*\#(?:[^\n/\\]+|/(?![/*])|\\(?:\r?\n)?)*)
+      | %s
+      | %s
+      | (?P<open>\{)
+      | (?P<close>\})
+      | (?P<end>\Z)
+    )
+''' % (comment_pattern, string_pattern), re.DOTALL | re.VERBOSE)
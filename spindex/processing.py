@@ -0,0 +1,501 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+import concurrent.futures
+from collections import OrderedDict
+
+import watchdog.utils
+from watchdog.utils.compat import queue
+
+from .cache import include_cache
+from . import log
+from .log import logger
+from .graph import get_file_name, get_or_add_node, include_resolver, nodes, retired_nodes, Node
+from .parser import process_buffer, read_file, update_buffer, ParseCancelled
+from .symbols import strings
+
+
+class ProcessQueueThread(watchdog.utils.DaemonThread):
+    def run(self):
+        while self.should_keep_running():
+            (file_name, view_buffer) = to_process.get()
+            if view_buffer is None:
+                self.process_existing_include(file_name)
+            elif view_buffer is WARM_UP:
+                size = self.warm_up(file_name)
+                if warmup_rate > 0:
+                    to_process.wait_for_lanes(WARMUP_LANE, size / 1024.0 / warmup_rate)
+            else:
+                self.process(file_name, view_buffer)
+
+            if to_process.empty():
+                retired_nodes.trim()
+                include_cache.save()
+
+
+    def process(self, view_file_name, view_buffer):
+        if isinstance(view_buffer, BufferChanges):
+            view_buffer = view_buffer.apply(nodes.get(view_file_name))
+            if view_buffer is None:
+                return
+
+        # stop as soon as the user typed more and a newer buffer got queued
+        cancelled = lambda: to_process.superseded(view_file_name, view_buffer)
+        if cancelled():
+            return
+
+        (current_node, node_added) = get_or_add_node(view_file_name)
+
+        base_includes = set()
+
+        try:
+            includes = update_buffer(view_buffer, current_node, cancelled)
+            self.load_includes(view_file_name, includes, current_node, base_includes, cancelled)
+
+            for removed_node in current_node.children.difference(base_includes):
+                current_node.remove_child(removed_node)
+        except ParseCancelled:
+            if log.info_enabled:
+                logger.info('Cancelled %s: a newer buffer is queued', view_file_name)
+
+
+    def process_existing_include(self, file_name):
+        current_node = nodes.get(file_name)
+        if current_node is None:
+            return
+
+        base_includes = set()
+        try:
+            stat = os.stat(file_name)
+            (data, digest) = read_file(file_name)
+            if digest != current_node.digest:
+                text = data.decode('utf-8')
+        except (IOError, OSError, UnicodeDecodeError) as e:
+            # e.g. modified then deleted by a checkout, the delete is handled on its own
+            logger.warning('Error parsing %s: %s', file_name, e)
+            return
+
+        # touched or rewritten with the same contents
+        if digest == current_node.digest:
+            include_cache.get(file_name, stat, digest)
+            if log.info_enabled:
+                logger.info('Skipped %s: contents unchanged', file_name)
+            return
+
+        includes = process_buffer(text, current_node)
+        self.load_includes(file_name, includes, current_node, base_includes)
+
+        for removed_node in current_node.children.difference(base_includes):
+            current_node.remove_child(removed_node)
+
+        current_node.digest = digest
+        include_cache.put(file_name, stat, digest, includes, current_node.funcs)
+
+
+    def warm_up(self, file_name):
+        """ Loads a file that isn't in the graph yet as a retired node
+
+        Returns the size of the files read to load it and its includes.
+        Nothing is loaded once the retired nodes are full, it would only get
+        evicted again.
+        """
+        if file_name in nodes or retired_nodes.full():
+            return 0
+
+        (node, node_added) = get_or_add_node(file_name)
+        size = self.load_node(file_name, node, node, set())
+
+        if not node.is_referenced():
+            retired_nodes.add(node)
+        return size
+
+
+    def load_includes(self, view_file_name, includes, base_node, base_includes, cancelled = None):
+        pool = parse_pool
+        if pool is None:
+            for include in includes:
+                self.load_from_file(view_file_name, include, base_node, base_node, base_includes, cancelled)
+        else:
+            self.load_from_pool(pool, view_file_name, includes, base_node, base_includes)
+
+
+    def add_include(self, view_file_name, base_file_name, parent_node, base_node, base_includes):
+        """ Links an include to parent_node, returns its node if it still has to be loaded """
+        (file_name, exists) = get_file_name(view_file_name, base_file_name)
+        (node, node_added) = get_or_add_node(file_name)
+        parent_node.add_child(node)
+
+        if parent_node == base_node:
+            base_includes.add(node)
+
+        if not node_added or not exists:
+            return None
+        return node
+
+
+    def load_from_file(self, view_file_name, base_file_name, parent_node, base_node, base_includes, cancelled = None):
+        # only checked between the includes of the buffer, a file is never
+        # left half loaded: its node wouldn't be loaded again
+        if cancelled is not None and parent_node == base_node and cancelled():
+            raise ParseCancelled(view_file_name)
+
+        node = self.add_include(view_file_name, base_file_name, parent_node, base_node, base_includes)
+        if node is None:
+            return 0
+        return self.load_node(view_file_name, node, base_node, base_includes)
+
+
+    def load_node(self, view_file_name, node, base_node, base_includes):
+        """ Loads the symbols of a new node from the cache or its file, and its includes
+
+        Returns the size of the files that were read, cache hits aren't.
+        """
+        file_name = node.file_name
+        size = 0
+        try:
+            stat = os.stat(file_name)
+            entry = include_cache.get(file_name, stat)
+            if entry is None:
+                (data, digest) = read_file(file_name)
+                size = len(data)
+                entry = include_cache.get(file_name, stat, digest)
+            if entry is None:
+                text = data.decode('utf-8')
+        except (IOError, OSError, UnicodeDecodeError) as e:
+            # the resolved file may be gone without the watcher telling,
+            # e.g. on network mounts, so it is resolved again next time
+            logger.warning('Error parsing %s: %s', file_name, e)
+            include_resolver.invalidate(file_name)
+            return size
+
+        if entry is not None:
+            (digest, includes, funcs) = entry
+            load_cache_entry(node, digest, funcs)
+        else:
+            includes = process_buffer(text, node)
+            node.digest = digest
+            include_cache.put(file_name, stat, digest, includes, node.funcs)
+
+        for include in includes:
+            size += self.load_from_file(view_file_name, include, node, base_node, base_includes)
+        return size
+
+
+    def load_from_pool(self, pool, view_file_name, includes, base_node, base_includes):
+        """ Walks the include tree breadth first and parses the new files in the pool
+
+        Only this thread touches the nodes: the workers parse a file on their
+        own and the results are merged here as they complete, so the includes
+        found in a file get submitted while its siblings are still parsed.
+        """
+        pending = dict()
+        found = [(base_node, includes)]
+
+        while found or pending:
+            for (parent_node, includes) in found:
+                for include in includes:
+                    node = self.add_include(view_file_name, include, parent_node, base_node, base_includes)
+                    if node is None:
+                        continue
+
+                    try:
+                        stat = os.stat(node.file_name)
+                    except (IOError, OSError) as e:
+                        logger.warning('Error parsing %s: %s', node.file_name, e)
+                        include_resolver.invalidate(node.file_name)
+                        continue
+
+                    entry = include_cache.get(node.file_name, stat)
+                    if entry is not None:
+                        load_cache_entry(node, entry[0], entry[2])
+                        found.append((node, entry[1]))
+                    else:
+                        future = submit_parse(pool, node.file_name, include_cache.digest(node.file_name))
+                        pending[future] = (node, stat)
+            found = []
+
+            if not pending:
+                break
+
+            (done, not_done) = concurrent.futures.wait(pending, return_when = concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                (node, stat) = pending.pop(future)
+                try:
+                    (digest, includes, funcs) = future.result()
+                    if funcs is None:
+                        # only touched, the cached symbols are still valid
+                        entry = include_cache.get(node.file_name, stat, digest)
+                        if entry is None:
+                            entry = parse_include(node.file_name)
+                        (digest, includes, funcs) = entry
+                except (IOError, OSError, UnicodeDecodeError) as e:
+                    logger.warning('Error parsing %s: %s', node.file_name, e)
+                    include_resolver.invalidate(node.file_name)
+                    continue
+
+                if parse_pool_config[1] == 'process':
+                    funcs = [strings.symbol(symbol) for symbol in funcs]
+                node.funcs = set(funcs)
+                node.digest = digest
+                node.changed()
+                include_cache.put(node.file_name, stat, digest, includes, funcs)
+                found.append((node, includes))
+
+
+class ProcessQueue(queue.Queue):
+    """ Queue of the files to process, in lanes of decreasing priority.
+
+    Items are (file name, buffer) tuples, put in one of the lanes: ACTIVE_LANE
+    for the view being edited, OPEN_LANE for other views, WATCHER_LANE for
+    include files changed on disk and WARMUP_LANE for background indexing.
+    get returns the oldest item of the first lane that isn't empty.
+
+    A file has at most one pending item of each kind: a buffer, a reparse
+    from disk (None buffer) and a warmup (WARM_UP buffer). The latest buffer put replaces the pending one in place,
+    BufferChanges are merged with it, so a file is parsed at most once per
+    pass over the queue however fast it is edited. All the pending items of
+    a file are kept in order in one lane, when a file is queued in a lane of
+    higher priority, its pending items are moved there.
+    """
+    def _init(self, maxsize):
+        self.lanes = [OrderedDict() for i in range(LANES)]
+        self.files = dict() # file name -> [lane, number of pending items]
+
+
+    def put(self, item, lane = None, block = True, timeout = None):
+        queue.Queue.put(self, (OPEN_LANE if lane is None else lane, item), block, timeout)
+
+
+    def _qsize(self):
+        return sum(len(items) for items in self.lanes)
+
+
+    def _put(self, entry):
+        (lane, item) = entry
+        file_name = item[0]
+        key = item_key(item)
+        pending = self.files.get(file_name)
+
+        if pending is None:
+            pending = self.files[file_name] = [lane, 0]
+        elif pending[0] > lane:
+            items = self.lanes[pending[0]]
+            for pending_key in [pending_key for pending_key in items if pending_key[0] == file_name]:
+                self.lanes[lane][pending_key] = items.pop(pending_key)
+            pending[0] = lane
+        else:
+            lane = pending[0]
+
+        items = self.lanes[lane]
+        if key in items:
+            if isinstance(item[1], BufferChanges):
+                item = (file_name, item[1].after(items[key][1]))
+            items[key] = item
+            # `put` increments `unfinished_tasks` even if nothing was added
+            self.unfinished_tasks -= 1
+            return
+
+        items[key] = item
+        pending[1] += 1
+
+
+    def superseded(self, file_name, text):
+        """superseded(string, string) -> bool
+
+        Returns whether a buffer of file_name is pending, meaning text, the one
+        being processed, is outdated. Pending changes were made on top of text,
+        so they are based on it as it won't be parsed.
+        """
+        with self.mutex:
+            pending = self.files.get(file_name)
+            if pending is None:
+                return False
+
+            items = self.lanes[pending[0]]
+            item = items.get((file_name, False))
+            if item is None:
+                return False
+
+            if isinstance(item[1], BufferChanges) and item[1].text is None:
+                items[(file_name, False)] = (file_name, item[1].after(text))
+            return True
+
+
+    def wait_for_lanes(self, lane, timeout):
+        """ Waits up to timeout seconds for an item in a lane of higher priority than lane """
+        end = time.time() + timeout
+        with self.not_empty:
+            while not any(self.lanes[:lane]):
+                remaining = end - time.time()
+                if remaining <= 0:
+                    return
+                self.not_empty.wait(remaining)
+
+
+    def _get(self):
+        for items in self.lanes:
+            if items:
+                (key, item) = items.popitem(False)
+                pending = self.files[item[0]]
+                pending[1] -= 1
+                if pending[1] == 0:
+                    del self.files[item[0]]
+                return item
+
+
+class BufferChanges:
+    """ Edits made to a buffer since its text was last queued.
+
+    changes is a list of (begin, end, string) replacements, applied in order
+    to text, or to the text parsed for the buffer if it is None. If that text
+    isn't the one the edits were made to, resync is called so the whole text
+    gets queued again.
+    """
+    def __init__(self, changes, size, resync, text = None):
+        self.changes = changes
+        self.size = size
+        self.resync = resync
+        self.text = text
+
+
+    def after(self, previous):
+        """after(object) -> BufferChanges
+
+        Returns these changes applied after a pending text or pending changes.
+        """
+        if isinstance(previous, BufferChanges):
+            return BufferChanges(previous.changes + self.changes, self.size, self.resync, previous.text)
+        return BufferChanges(self.changes, self.size, self.resync, previous)
+
+
+    def apply(self, node):
+        """apply(Node) -> string"""
+        text = self.text
+        if text is None and node is not None:
+            text = node.text
+        if text is not None:
+            for (begin, end, string) in self.changes:
+                text = text[:begin] + string + text[end:]
+
+        if text is None or len(text) != self.size:
+            logger.info('Buffer changes out of sync, requesting the whole text')
+            self.resync()
+            return None
+        return text
+
+
+def item_key(item):
+    """ Queue items of a file are keyed by kind: buffers share one key """
+    if item[1] is None or item[1] is WARM_UP:
+        return item
+    return (item[0], False)
+
+
+def load_cache_entry(node, digest, funcs):
+    node.funcs = set([strings.symbol(symbol) for symbol in funcs])
+    node.digest = digest
+    node.changed()
+    if log.info_enabled:
+        logger.info('Loaded %s from cache: %d symbols', node.file_name, len(node.funcs))
+
+
+def parse_include(file_name, known_digest = None):
+    """parse_include(string, bytes) -> (bytes, list, tuple)
+
+    Reads and parses an include file apart from the graph, so it can run in a
+    worker thread or process. Returns the digest, the includes and the symbols
+    of the file, or only the digest if it is known_digest.
+    """
+    (data, digest) = read_file(file_name)
+    if digest == known_digest:
+        return (digest, None, None)
+
+    node = Node(file_name)
+    includes = process_buffer(data.decode('utf-8'), node)
+    return (digest, includes, tuple(node.funcs))
+
+
+def submit_parse(pool, file_name, known_digest):
+    try:
+        return pool.submit(parse_include, file_name, known_digest)
+    except RuntimeError:
+        # The pool was shut down by set_parse_workers, parse the file here
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(parse_include(file_name, known_digest))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def queue_warmup(directories):
+    """queue_warmup(list)
+
+    Queues every .sp and .inc file below directories in WARMUP_LANE, so they
+    are indexed in the background before they get opened.
+    """
+    for directory in directories:
+        for (path, dirs, files) in os.walk(directory):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith('.sp') or name.endswith('.inc'):
+                    to_process.put((os.path.join(path, name), WARM_UP), WARMUP_LANE)
+
+
+def set_warmup_rate(rate):
+    """set_warmup_rate(int)
+
+    Limits the warmup to reading rate KB of files per second (0 - no limit).
+    """
+    global warmup_rate
+    warmup_rate = max(float(rate), 0)
+
+
+def set_parse_workers(count, kind = 'thread'):
+    """set_parse_workers(int, string)
+
+    Parses include files in a pool of count threads or processes (kind is
+    'thread' or 'process'). Below 2 workers the processing thread parses the
+    files itself.
+    """
+    global parse_pool, parse_pool_config
+
+    config = (max(int(count), 1), kind)
+    if config == parse_pool_config:
+        return
+
+    old_pool = parse_pool
+    if config[0] < 2:
+        parse_pool = None
+    elif kind == 'process':
+        parse_pool = concurrent.futures.ProcessPoolExecutor(config[0])
+    else:
+        parse_pool = concurrent.futures.ThreadPoolExecutor(config[0])
+    parse_pool_config = config
+
+    if old_pool is not None:
+        old_pool.shutdown(wait = False)
+
+
+ACTIVE_LANE = 0
+OPEN_LANE = 1
+WATCHER_LANE = 2
+WARMUP_LANE = 3
+LANES = 4
+WARM_UP = object() # buffer of the items queued by queue_warmup
+to_process = ProcessQueue()
+parse_pool = None
+parse_pool_config = (1, 'thread')
+warmup_rate = 2048.0
@@ -0,0 +1,118 @@
+# SourcePawn Completions is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import namedtuple
+
+
+class Symbol(namedtuple('Symbol', 'kind name detail params label')):
+    """ A symbol found in a file.
+
+    kind is FUNCTION, ENUM, CONSTANT or VARIABLE, detail the return type, the
+    enum name or the constant value and params a tuple of the parameters of a
+    function. label is the name of the file without its extension.
+
+    Only the parts of the symbol are kept, the trigger and the contents shown
+    by Sublime Text are built when the symbol is returned as a completion.
+    """
+    __slots__ = ()
+
+
+    def trigger(self):
+        """trigger() -> string"""
+        (kind, name, detail, params, label) = self
+        if detail or kind == FUNCTION or kind == CONSTANT:
+            trigger = name + '\t(' + kind + ': ' + detail + ')'
+        else:
+            trigger = name + '\t(' + kind + ')'
+
+        if label:
+            trigger += ' [' + label + ']'
+        return trigger
+
+
+    def contents(self):
+        """contents() -> string"""
+        (kind, name, detail, params, label) = self
+        if kind != FUNCTION:
+            return name
+        return name + '(' + ', '.join(['${%d:%s}' % (i + 1, escape_snippet(params[i])) for i in range(len(params))]) + ')'
+
+
+    def completion(self):
+        """completion() -> (string, string)"""
+        return (self.trigger(), self.contents())
+
+
+class StringTable:
+    """ Keeps a single copy of the strings repeated across symbols, like the
+    file labels, types and parameters.
+    """
+    def __init__(self):
+        self.strings = dict()
+        self.live = 0   # strings left by the last prune
+
+
+    def get(self, string):
+        """get(string) -> string"""
+        return self.strings.setdefault(string, string)
+
+
+    def symbol(self, symbol):
+        """symbol(Symbol) -> Symbol
+
+        Returns symbol with the strings of the table, for symbols that were
+        unpickled or parsed in another process.
+        """
+        (kind, name, detail, params, label) = symbol
+        get = self.get
+        if params:
+            params = tuple([get(param) for param in params])
+        return Symbol(get(kind), name, get(detail), params, get(label))
+
+
+    def prune(self, nodes):
+        """prune(iterable of Node)
+
+        Drops the strings no symbol of nodes uses anymore, like the ones of
+        edited buffers. Does nothing until the table doubled since the last
+        prune, so the cost of walking the symbols is spread over the strings
+        added meanwhile.
+        """
+        if len(self.strings) <= 2 * self.live + 256:
+            return
+
+        table = dict()
+        for node in nodes:
+            table[node.label] = node.label
+            for (kind, name, detail, params, label) in node.funcs:
+                table[kind] = kind
+                table[detail] = detail
+                table[label] = label
+                for param in params:
+                    table[param] = param
+        self.strings = table
+        self.live = len(table)
+
+
+def escape_snippet(text):
+    """escape_snippet(string) -> string"""
+    if '$' in text or '}' in text or '\\' in text:
+        return text.replace('\\', '\\\\').replace('$', '\\$').replace('}', '\\}')
+    return text
+
+
+FUNCTION = 'function'
+ENUM = 'enum'
+CONSTANT = 'constant'
+VARIABLE = 'variable'
+strings = StringTable()
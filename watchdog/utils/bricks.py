@@ -40,6 +40,11 @@ import sys
 import collections
 from .compat import queue
 
+try:
+    from collections.abc import MutableSet
+except ImportError:
+    from collections import MutableSet
+
 class SkipRepeatsQueue(queue.Queue):
 
     """Thread-safe implementation of an special queue where a
@@ -172,7 +177,7 @@ class OrderedSetQueue(queue.Queue):
 if sys.version_info >= (2, 6, 0):
     KEY, PREV, NEXT = list(range(3))
 
-    class OrderedSet(collections.MutableSet):
+    class OrderedSet(MutableSet):
 
         """
         Implementation based on a doubly-linked link and an internal dictionary.